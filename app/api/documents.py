@@ -1,20 +1,69 @@
 """API endpoints for document and RAG operations"""
+import asyncio
+import hashlib
+import io
 import os
 import shutil
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
 from datetime import datetime
 from ..schemas import documents as schemas
 from ..models import documents as models
 from ..core.limiter import limiter
+from ..core.responses import stream_json_list, STREAM_BATCH_SIZE
 from ..core.logging import logger
-from ..core.rag.chunker import DocumentProcessor
+from ..core.rag.chunker import get_document_processor
 from ..core.rag.vectorstore import get_vector_store
-from .sessions import get_db
+from .sessions import get_db, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/documents", tags=["Documents & RAG"])
 
+UPLOAD_SEMAPHORE = asyncio.Semaphore(int(os.getenv("UPLOAD_CONCURRENCY", 8)))
+
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+def _copy_file_range(src_fd: int, src, file_path: str):
+    offset = src.tell()
+    dst_fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while True:
+            copied = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK_SIZE, offset_src=offset)
+            if not copied:
+                break
+            offset += copied
+    finally:
+        os.close(dst_fd)
+
+def _copy_upload(src, file_path: str):
+    """Copy an upload to disk, in-kernel when the spooled upload is backed by a real file"""
+    if hasattr(os, "copy_file_range"):
+        # Buffers without a descriptor (plain in-memory files) take the buffered copy
+        try:
+            src_fd = src.fileno()
+        except (io.UnsupportedOperation, OSError):
+            src_fd = None
+        if src_fd is not None:
+            try:
+                _copy_file_range(src_fd, src, file_path)
+                return
+            except OSError as e:
+                logger.warning(f"copy_file_range unavailable for {file_path}, falling back to buffered copy: {e}")
+    
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(src, buffer)
+
+def _file_sha256(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+async def _save_upload(file: UploadFile, upload_dir: str):
+    async with UPLOAD_SEMAPHORE:
+        await asyncio.to_thread(_copy_upload, file.file, os.path.join(upload_dir, file.filename))
+
 @router.post("/ingest", response_model=schemas.DocumentIngestionResponse)
 @limiter.limit("5/minute")
 async def ingest_documents(
@@ -26,24 +75,13 @@ async def ingest_documents(
     start_time = datetime.utcnow()
     
     try:
-        processor = DocumentProcessor(ingest_request.chunk_size, ingest_request.chunk_overlap)
+        processor = get_document_processor(ingest_request.chunk_size, ingest_request.chunk_overlap)
         vector_store = get_vector_store()
         
-        results = processor.process_folder(ingest_request.folder_path)
+        results = await asyncio.to_thread(processor.process_folder, ingest_request.folder_path)
         
-        processed_count = 0
-        total_chunks = 0
-        failed_documents = []
-        
-        for document, chunks in results:
-            try:
-                document_id = vector_store.store_document(document, db)
-                stored_count = vector_store.store_embeddings(chunks, document_id, db)
-                processed_count += 1
-                total_chunks += stored_count
-            except Exception as e:
-                logger.error(f"Failed to process {document.filename}: {e}")
-                failed_documents.append(document.filename)
+        document_ids, total_chunks, failed_documents = vector_store.store_documents(results, db)
+        processed_count = len(document_ids)
         
         processing_time = (datetime.utcnow() - start_time).total_seconds()
         
@@ -58,16 +96,30 @@ async def ingest_documents(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/", response_model=List[schemas.DocumentBase])
-async def list_documents(request: Request, db: Session = Depends(get_db)):
-    """List all documents"""
-    documents = db.query(models.Document).all()
-    return documents
+async def list_documents(
+    request: Request,
+    cursor: Optional[uuid.UUID] = Query(None, description="Return documents after this document id"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    filename: Optional[str] = Query(None, min_length=3, description="Case-insensitive filename substring (3+ characters, so the trigram index applies)"),
+    db: Session = Depends(get_db)
+):
+    """List documents, paginated by id"""
+    query = db.query(models.Document)
+    if filename:
+        # Literal substring match: escape LIKE wildcards in the user input
+        pattern = filename.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(models.Document.filename.ilike(f"%{pattern}%", escape="\\"))
+    if cursor is not None:
+        query = query.filter(models.Document.id > cursor)
+    documents = query.order_by(models.Document.id).limit(limit).yield_per(STREAM_BATCH_SIZE)
+    return stream_json_list(documents, schemas.DocumentBase)
 
 @router.post("/search", response_model=schemas.RAGSearchResponse)
 @limiter.limit("100/minute")
 async def search_documents(
     request: Request,
-    search_request: schemas.RAGSearchRequest
+    search_request: schemas.RAGSearchRequest,
+    db: Session = Depends(get_db)
 ):
     """Search for relevant document chunks"""
     try:
@@ -75,25 +127,28 @@ async def search_documents(
         results = vector_store.search_similar(
             search_request.query,
             search_request.top_k,
-            search_request.threshold
+            search_request.threshold,
+            db=db
         )
         
+        # Rows come straight from the database: serialize plain dicts with orjson instead of
+        # building and re-validating a RAGSearchResult per row (response_model documents the shape)
         search_results = [
-            schemas.RAGSearchResult(
-                chunk_id=r["chunk_id"],
-                document_id=r["document_id"],
-                filename=r["filename"],
-                chunk_text=r["chunk_text"],
-                similarity=r["similarity"]
-            )
+            {
+                "chunk_id": r["chunk_id"],
+                "document_id": r["document_id"],
+                "filename": r["filename"],
+                "chunk_text": r["chunk_text"],
+                "similarity": r["similarity"]
+            }
             for r in results
         ]
         
-        return schemas.RAGSearchResponse(
-            query=search_request.query,
-            results=search_results,
-            total_results=len(search_results)
-        )
+        return ORJSONResponse({
+            "query": search_request.query,
+            "results": search_results,
+            "total_results": len(search_results)
+        })
     except Exception as e:
         logger.error(f"Search failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -118,41 +173,59 @@ async def upload_documents(
     failed_uploads = []
     
     try:
-        # Save uploaded files
-        for file in files:
-            if file.filename:
-                file_path = os.path.join(upload_dir, file.filename)
-                try:
-                    with open(file_path, "wb") as buffer:
-                        shutil.copyfileobj(file.file, buffer)
-                    uploaded_files.append(file.filename)
-                    logger.info(f"Uploaded file: {file.filename}")
-                except Exception as e:
-                    logger.error(f"Failed to upload {file.filename}: {e}")
-                    failed_uploads.append(file.filename)
+        # Save uploaded files concurrently, off the event loop
+        named_files = [file for file in files if file.filename]
+        saved = await asyncio.gather(
+            *[_save_upload(file, upload_dir) for file in named_files],
+            return_exceptions=True
+        )
+        for file, result in zip(named_files, saved):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to upload {file.filename}: {result}")
+                failed_uploads.append(file.filename)
+            else:
+                uploaded_files.append(file.filename)
+                logger.info(f"Uploaded file: {file.filename}")
         
-        # Process uploaded files
-        processor = DocumentProcessor(chunk_size, chunk_overlap)
-        vector_store = get_vector_store()
+        # Skip files whose exact content is already ingested under the same filename
+        file_hashes = dict(zip(uploaded_files, await asyncio.gather(
+            *[asyncio.to_thread(_file_sha256, os.path.join(upload_dir, name)) for name in uploaded_files]
+        )))
+        known_files = set(
+            db.query(models.IngestedFile.hash, models.Document.filename)
+            .join(models.Document, models.Document.id == models.IngestedFile.document_id)
+            .filter(models.IngestedFile.hash.in_(set(file_hashes.values())))
+            .all()
+        )
+        new_files = {}
+        for name, file_hash in file_hashes.items():
+            if (file_hash, name) in known_files:
+                logger.info(f"Skipping unchanged file: {name}")
+            else:
+                new_files[name] = file_hash
+        skipped_count = len(file_hashes) - len(new_files)
         
-        results = processor.process_folder(upload_dir)
+        # Process only the newly uploaded files
+        processor = get_document_processor(chunk_size, chunk_overlap)
+        vector_store = get_vector_store()
         
-        processed_count = 0
-        total_chunks = 0
-        failed_documents = []
+        results = await asyncio.to_thread(
+            processor.process_files, [os.path.join(upload_dir, name) for name in new_files]
+        )
+        document_ids, total_chunks, failed_documents = vector_store.store_documents(results, db)
+        processed_count = len(document_ids) + skipped_count
         
-        for document, chunks in results:
-            # Only process files that were just uploaded
-            if document.filename in uploaded_files:
-                try:
-                    document_id = vector_store.store_document(document, db)
-                    stored_count = vector_store.store_embeddings(chunks, document_id, db)
-                    processed_count += 1
-                    total_chunks += stored_count
-                    logger.info(f"Processed {document.filename}: {stored_count} chunks")
-                except Exception as e:
-                    logger.error(f"Failed to process {document.filename}: {e}")
-                    failed_documents.append(document.filename)
+        # Remember content hashes; store_documents already dropped older ones for these documents.
+        # A concurrent upload of the same file may have recorded the hash first.
+        if document_ids:
+            db.execute(
+                insert(models.IngestedFile).values([
+                    {"hash": file_hash, "document_id": document_ids[name]}
+                    for name, file_hash in new_files.items()
+                    if name in document_ids
+                ]).on_conflict_do_nothing()
+            )
+            db.commit()
         
         processing_time = (datetime.utcnow() - start_time).total_seconds()
         
@@ -1,21 +1,37 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import asyncio
+import time
+from fastapi import APIRouter
 from sqlalchemy import text
 from datetime import datetime
 from typing import Dict, Any
+from ..core.database import SessionLocal
 from ..core.logging import logger
-from .sessions import get_db
 
 router = APIRouter(prefix="/health", tags=["Health Check"])
 
-@router.get("/", response_model=Dict[str, Any])
-async def health_check(db: Session = Depends(get_db)):
+# Probes hit this endpoint often; reuse the last database check for a short while
+HEALTH_CACHE_TTL_SECONDS = 2.0
+_db_health = {"status": "unhealthy", "checked_at": float("-inf")}
+
+def _probe_database() -> str:
+    db = SessionLocal()
     try:
         db.execute(text("SELECT 1"))
-        db_status = "healthy"
-    except:
-        db_status = "unhealthy"
-    
+        return "healthy"
+    except Exception as e:
+        logger.warning(f"Database health check failed: {e}")
+        return "unhealthy"
+    finally:
+        db.close()
+
+@router.get("/", response_model=Dict[str, Any])
+async def health_check():
+    now = time.monotonic()
+    if now - _db_health["checked_at"] > HEALTH_CACHE_TTL_SECONDS:
+        _db_health["status"] = await asyncio.to_thread(_probe_database)
+        _db_health["checked_at"] = now
+    db_status = _db_health["status"]
+
     return {
         "service": "RAG Chat Storage",
         "status": "healthy" if db_status == "healthy" else "unhealthy",
@@ -1,13 +1,27 @@
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
 from ..models import chat as models
 from ..schemas import chat as schemas
-from .sessions import get_db
+from .sessions import get_db, MAX_PAGE_SIZE
 from ..core.limiter import limiter
+from ..core.responses import UTCZResponse
 
 router = APIRouter(prefix="/sessions/{session_id}/messages", tags=["Chat Messages"])
 
+# Columns of schemas.ChatMessage, read as plain rows instead of ORM objects
+MESSAGE_COLUMNS = (
+    models.ChatMessage.id,
+    models.ChatMessage.session_id,
+    models.ChatMessage.sender,
+    models.ChatMessage.content,
+    models.ChatMessage.retrieved_context,
+    models.ChatMessage.created_at,
+)
+
 @router.post("/", response_model=schemas.ChatMessage, status_code=status.HTTP_201_CREATED)
 @limiter.limit("100/minute")
 async def add_message_to_session(request: Request, session_id: uuid.UUID, message: schemas.ChatMessageCreate, db: Session = Depends(get_db)):
@@ -21,6 +35,31 @@ async def add_message_to_session(request: Request, session_id: uuid.UUID, messag
     return db_message
 
 @router.get("/", response_model=list[schemas.ChatMessage])
-async def get_messages_for_session(request: Request, session_id: uuid.UUID, db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
-    messages = db.query(models.ChatMessage).filter(models.ChatMessage.session_id == session_id).order_by(models.ChatMessage.created_at).offset(skip).limit(limit).all()
-    return messages
+async def get_messages_for_session(
+    request: Request,
+    session_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    cursor: Optional[datetime] = Query(None, description="created_at of the last message on the previous page"),
+    cursor_id: Optional[uuid.UUID] = Query(None, description="id of the last message on the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE)
+):
+    """
+    Messages oldest-first. For the next page, pass the created_at and id of the last
+    message returned as cursor and cursor_id; cursor alone skips messages that share its timestamp.
+    """
+    query = (
+        select(*MESSAGE_COLUMNS)
+        .where(models.ChatMessage.session_id == session_id)
+        .order_by(models.ChatMessage.created_at, models.ChatMessage.id)
+    )
+    if cursor is not None and cursor_id is not None:
+        query = query.where(tuple_(models.ChatMessage.created_at, models.ChatMessage.id) > (cursor, cursor_id))
+    elif cursor is not None:
+        query = query.where(models.ChatMessage.created_at > cursor)
+    elif skip:
+        # Offset paging is kept for older clients; prefer the cursor
+        query = query.offset(skip)
+    # Rows already have the response shape: skip ORM objects and per-row model validation
+    messages: List[schemas.ChatMessageRow] = [dict(row) for row in db.execute(query.limit(limit)).mappings()]
+    return UTCZResponse(messages)
@@ -1,8 +1,10 @@
 """RAG Chat API endpoints for intelligent conversation"""
+import re
 import uuid
+from datetime import datetime, timezone
+from itertools import islice
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from pydantic import BaseModel
 from typing import Optional
 from ..models import chat as models
@@ -15,6 +17,40 @@ from .sessions import get_db
 
 router = APIRouter(prefix="/chat", tags=["RAG Chat"])
 
+def _keyword_pattern(*terms: str) -> re.Pattern:
+    """Compile a case-insensitive substring matcher for any of the given terms"""
+    return re.compile("|".join(map(re.escape, terms)), re.IGNORECASE)
+
+# Topic keywords scanned in retrieved context, compiled once so each group is one C-level pass
+CAPABILITY_PATTERNS = (
+    (_keyword_pattern("performance", "metrics", "analysis", "data"), "• Performance analysis and metrics interpretation"),
+    (_keyword_pattern("implementation", "guide", "tutorial", "steps"), "• Implementation guidance and step-by-step instructions"),
+    (_keyword_pattern("use case", "application", "example", "scenario"), "• Use case examples and practical applications"),
+    (_keyword_pattern("test", "testing", "validation", "verification"), "• Testing strategies and validation approaches"),
+    (_keyword_pattern("configuration", "setup", "installation", "deployment"), "• Configuration and setup assistance"),
+)
+
+# Message cues, built once instead of per request
+STANDALONE_GREETINGS = frozenset({"hello", "hi", "hey", "good morning", "good afternoon", "hi there", "hello there"})
+HELP_PHRASES = _keyword_pattern("how can you help", "what can you do", "help me", "assist me", "what can you help with")
+DEFINITION_CUES = _keyword_pattern("what is", "what are", "define", "explain")
+
+# Question kinds in precedence order; one alternation classifies the message in a single pass
+QUESTION_KIND_TERMS = (
+    ("definition", ("what is", "what are", "define", "definition of")),
+    ("how_to", ("how does", "how do", "how can", "how to")),
+    ("explanation", ("why", "what makes", "what causes")),
+    ("features", ("features", "capabilities", "what can", "supports")),
+    ("general", ("tell me about", "explain", "describe")),
+)
+QUESTION_KIND = re.compile(
+    "|".join(f"(?P<{kind}>{'|'.join(map(re.escape, terms))})" for kind, terms in QUESTION_KIND_TERMS)
+)
+QUESTION_KIND_PRECEDENCE = {kind: rank for rank, (kind, _) in enumerate(QUESTION_KIND_TERMS)}
+
+HOW_TO_TERMS = _keyword_pattern("process", "step", "method", "way", "how", "use", "work")
+FEATURE_TERMS = _keyword_pattern("feature", "support", "include", "provide", "enable", "allow")
+
 class ChatRequest(BaseModel):
     session_id: uuid.UUID
     message: str
@@ -43,23 +79,24 @@ async def send_chat_message(
         if not session:
             raise HTTPException(status_code=404, detail="Chat session not found")
         
-        # Store user message
+        # Store user message; timestamps are set client-side so both messages and the
+        # session update go out in a single transaction without refresh round-trips
         user_message = models.ChatMessage(
             session_id=chat_request.session_id,
             sender="user",
             content=chat_request.message,
-            retrieved_context=None
+            retrieved_context=None,
+            created_at=datetime.now(timezone.utc)
         )
         db.add(user_message)
-        db.commit()
-        db.refresh(user_message)
         
         # Get relevant context from vector store
         vector_store = get_vector_store()
         search_results = vector_store.search_similar(
             chat_request.message,
             top_k=3,
-            threshold=0.1
+            threshold=0.1,
+            db=db
         )
         
         # Generate intelligent response
@@ -67,8 +104,11 @@ async def send_chat_message(
         if search_results:
             context = "\n\n".join([result["chunk_text"] for result in search_results])
         
+        # Split the context once; every response generator works off these sentences
+        context_sentences = split_sentences(context)
+        
         assistant_response = generate_intelligent_response(
-            chat_request.message, context, current_user.name
+            chat_request.message, context, context_sentences, current_user.name
         )
         
         # Store assistant response
@@ -76,41 +116,40 @@ async def send_chat_message(
             session_id=chat_request.session_id,
             sender="assistant",
             content=assistant_response,
-            retrieved_context=context if context else None
+            retrieved_context=context if context else None,
+            created_at=datetime.now(timezone.utc)
         )
         db.add(assistant_message)
-        db.commit()
-        db.refresh(assistant_message)
         
         # Update session timestamp
-        session.updated_at = db.execute(text("SELECT NOW()")).scalar()
-        db.commit()
+        session.updated_at = assistant_message.created_at
+        db.flush()
         
-        return ChatResponse(
+        response = ChatResponse(
             session_id=chat_request.session_id,
             user_message=user_message,
             assistant_message=assistant_message
         )
+        db.commit()
+        return response
         
     except Exception as e:
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail="Failed to process chat message")
 
-def generate_intelligent_response(user_message: str, context: str, user_name: str) -> str:
+def generate_intelligent_response(user_message: str, context: str, context_sentences: list[str], user_name: str) -> str:
     """Generate an intelligent response based on user message and context"""
     user_message_lower = user_message.lower().strip()
     
     # Only handle very specific greetings (standalone greetings, not questions)
-    standalone_greetings = ["hello", "hi", "hey", "good morning", "good afternoon", "hi there", "hello there"]
-    if user_message_lower in standalone_greetings or (len(user_message.split()) <= 3 and any(greeting == user_message_lower for greeting in standalone_greetings)):
+    if user_message_lower in STANDALONE_GREETINGS:
         if context:
             return f"Hello {user_name}! I'm here to help you with your questions. Based on the documents I have access to, I can assist you with various topics. What would you like to know more about?"
         else:
             return f"Hello {user_name}! I'm your AI assistant. While I don't have specific documents loaded right now, I'm here to help answer your questions. What can I assist you with today?"
     
     # Handle "how can you help" questions (but not "what is" questions)
-    help_phrases = ["how can you help", "what can you do", "help me", "assist me", "what can you help with"]
-    if any(phrase in user_message_lower for phrase in help_phrases) and not any(q in user_message_lower for q in ["what is", "what are", "define", "explain"]):
+    if HELP_PHRASES.search(user_message_lower) and not DEFINITION_CUES.search(user_message_lower):
         if context:
             capabilities = analyze_document_capabilities(context)
             return f"I can help you with several things based on the documents in my knowledge base:\n\n{capabilities}\n\nFeel free to ask me specific questions about any of these topics, and I'll provide detailed answers based on the available information."
@@ -119,31 +158,14 @@ def generate_intelligent_response(user_message: str, context: str, user_name: st
     
     # Handle questions with context - this should be the main path
     if context:
-        return generate_contextual_response(user_message, context)
+        return generate_contextual_response(user_message, user_message_lower, context, context_sentences)
     else:
         # No relevant context found
         return f"I don't have specific information about '{user_message}' in my current knowledge base. Could you provide more details about what you're looking for, or consider uploading relevant documents that I can reference to give you a more accurate answer?"
 
 def analyze_document_capabilities(context: str) -> str:
     """Analyze context to determine what topics the assistant can help with"""
-    context_lower = context.lower()
-    capabilities = []
-    
-    # Look for common topics/domains
-    if any(term in context_lower for term in ["performance", "metrics", "analysis", "data"]):
-        capabilities.append("• Performance analysis and metrics interpretation")
-    
-    if any(term in context_lower for term in ["implementation", "guide", "tutorial", "steps"]):
-        capabilities.append("• Implementation guidance and step-by-step instructions")
-    
-    if any(term in context_lower for term in ["use case", "application", "example", "scenario"]):
-        capabilities.append("• Use case examples and practical applications")
-    
-    if any(term in context_lower for term in ["test", "testing", "validation", "verification"]):
-        capabilities.append("• Testing strategies and validation approaches")
-    
-    if any(term in context_lower for term in ["configuration", "setup", "installation", "deployment"]):
-        capabilities.append("• Configuration and setup assistance")
+    capabilities = [label for pattern, label in CAPABILITY_PATTERNS if pattern.search(context)]
     
     if not capabilities:
         capabilities.append("• General questions about the topics covered in the documents")
@@ -152,41 +174,31 @@ def analyze_document_capabilities(context: str) -> str:
     
     return "\n".join(capabilities)
 
+def split_sentences(context: str, separator: str = ".", min_length: int = 15) -> list[str]:
+    """Split context into stripped sentences longer than min_length, keeping the loop in C builtins"""
+    return [s for s in map(str.strip, context.replace('\n', ' ').split(separator)) if len(s) > min_length]
+
 def extract_key_points(context: str) -> list[str]:
     """Extract key points from context for generating responses"""
     # Simple extraction - in a real implementation, you might use NLP techniques
-    sentences = context.replace('\n', ' ').split('. ')
-    # Return first few meaningful sentences
-    key_points = []
-    for sentence in sentences[:3]:
-        if len(sentence.strip()) > 20:  # Filter out very short sentences
-            key_points.append(sentence.strip())
-    return key_points
+    # Only the first few sentences are used, so stop splitting after them
+    sentences = context.replace('\n', ' ').split('. ', 3)[:3]
+    # Return first few meaningful sentences, filtering out very short ones
+    return [s for s in map(str.strip, sentences) if len(s) > 20]
 
-def generate_contextual_response(user_message: str, context: str) -> str:
+def generate_contextual_response(user_message: str, user_message_lower: str, context: str, context_sentences: list[str]) -> str:
     """Generate an intelligent contextual response based on user message and retrieved context"""
     if not context or not context.strip():
         return "I don't have specific information about that topic in my current knowledge base. Could you provide more details or try rephrasing your question?"
     
-    user_message_lower = user_message.lower().strip()
-    
-    # Extract key information from context
-    context_sentences = [s.strip() for s in context.replace('\n', ' ').split('.') if len(s.strip()) > 15]
-    
     # Determine question type and generate appropriate response
-    if any(word in user_message_lower for word in ['what is', 'what are', 'define', 'definition of']):
-        return generate_definition_response(user_message, context_sentences)
-    elif any(word in user_message_lower for word in ['how does', 'how do', 'how can', 'how to']):
-        return generate_how_to_response(user_message, context_sentences)
-    elif any(word in user_message_lower for word in ['why', 'what makes', 'what causes']):
-        return generate_explanation_response(user_message, context_sentences)
-    elif any(word in user_message_lower for word in ['features', 'capabilities', 'what can', 'supports']):
-        return generate_features_response(user_message, context_sentences)
-    elif any(word in user_message_lower for word in ['tell me about', 'explain', 'describe']):
-        return generate_general_response(user_message, context_sentences)
+    kinds = {match.lastgroup for match in QUESTION_KIND.finditer(user_message_lower)}
+    if kinds:
+        generator = RESPONSE_GENERATORS[min(kinds, key=QUESTION_KIND_PRECEDENCE.__getitem__)]
     else:
         # Default to general response
-        return generate_general_response(user_message, context_sentences)
+        generator = generate_general_response
+    return generator(user_message, context_sentences)
 
 def generate_definition_response(user_message: str, context_sentences: list[str]) -> str:
     """Generate a definition-style response"""
@@ -208,7 +220,8 @@ def generate_definition_response(user_message: str, context_sentences: list[str]
 
 def generate_how_to_response(user_message: str, context_sentences: list[str]) -> str:
     """Generate a how-to or process-oriented response"""
-    relevant_sentences = [s for s in context_sentences if any(word in s.lower() for word in ['process', 'step', 'method', 'way', 'how', 'use', 'work'])]
+    # Only the first three matches are used, so stop scanning once they are found
+    relevant_sentences = list(islice(filter(HOW_TO_TERMS.search, context_sentences), 3))
     
     if not relevant_sentences:
         relevant_sentences = context_sentences[:2]
@@ -239,7 +252,7 @@ def generate_explanation_response(user_message: str, context_sentences: list[str
 
 def generate_features_response(user_message: str, context_sentences: list[str]) -> str:
     """Generate a features/capabilities focused response"""
-    feature_sentences = [s for s in context_sentences if any(word in s.lower() for word in ['feature', 'support', 'include', 'provide', 'enable', 'allow'])]
+    feature_sentences = list(islice(filter(FEATURE_TERMS.search, context_sentences), 4))
     
     if not feature_sentences:
         feature_sentences = context_sentences[:3]
@@ -267,3 +280,11 @@ def generate_general_response(user_message: str, context_sentences: list[str]) -
         response += "I have more information available if you'd like me to elaborate on any specific aspect."
     
     return response
+
+RESPONSE_GENERATORS = {
+    "definition": generate_definition_response,
+    "how_to": generate_how_to_response,
+    "explanation": generate_explanation_response,
+    "features": generate_features_response,
+    "general": generate_general_response,
+}
@@ -1,14 +1,21 @@
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session, joinedload
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, selectinload
 from ..models import chat as models
 from ..schemas import chat as schemas
 from ..core.database import SessionLocal
 from ..core.limiter import limiter
+from ..core.responses import stream_json_list, STREAM_BATCH_SIZE
 from ..core.security import get_current_user
 
 router = APIRouter(prefix="/sessions", tags=["Chat Sessions"])
 
+# Hard cap on list endpoint page sizes
+MAX_PAGE_SIZE = 200
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,9 +25,29 @@ def get_db():
 
 @router.get("/", response_model=list[schemas.ChatSession])
 @limiter.limit("60/minute")
-async def get_all_chat_sessions(request: Request, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    sessions = db.query(models.ChatSession).filter(models.ChatSession.user_id == current_user.id).order_by(models.ChatSession.updated_at.desc()).all()
-    return sessions
+async def get_all_chat_sessions(
+    request: Request,
+    cursor: Optional[datetime] = Query(None, description="updated_at of the last session on the previous page"),
+    cursor_id: Optional[uuid.UUID] = Query(None, description="id of the last session on the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    favorites_only: bool = Query(False, description="Return only sessions marked as favorite"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Sessions newest-first. For the next page, pass the updated_at and id of the last
+    session returned as cursor and cursor_id; cursor alone skips sessions that share its timestamp.
+    """
+    query = db.query(models.ChatSession).filter(models.ChatSession.user_id == current_user.id)
+    if favorites_only:
+        # Matches the predicate of the partial favorites index
+        query = query.filter(models.ChatSession.is_favorite)
+    if cursor is not None and cursor_id is not None:
+        query = query.filter(tuple_(models.ChatSession.updated_at, models.ChatSession.id) < (cursor, cursor_id))
+    elif cursor is not None:
+        query = query.filter(models.ChatSession.updated_at < cursor)
+    sessions = query.order_by(models.ChatSession.updated_at.desc(), models.ChatSession.id.desc()).limit(limit).yield_per(STREAM_BATCH_SIZE)
+    return stream_json_list(sessions, schemas.ChatSession)
 
 @router.post("/", response_model=schemas.ChatSession, status_code=status.HTTP_201_CREATED)
 @limiter.limit("20/minute")
@@ -31,9 +58,9 @@ async def create_chat_session(request: Request, session: schemas.ChatSessionCrea
     db.refresh(db_session)
     return db_session
 
-@router.get("/{session_id}", response_model=schemas.ChatSession)
+@router.get("/{session_id}", response_model=schemas.ChatSessionWithMessages)
 async def get_chat_session(session_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_session = db.query(models.ChatSession).options(joinedload(models.ChatSession.messages)).filter(models.ChatSession.id == session_id).first()
+    db_session = db.query(models.ChatSession).options(selectinload(models.ChatSession.messages)).filter(models.ChatSession.id == session_id).first()
     if not db_session:
         raise HTTPException(status_code=404, detail="Chat session not found")
     return db_session
@@ -43,7 +70,7 @@ async def update_chat_session(request: Request, session_id: uuid.UUID, update: s
     db_session = db.query(models.ChatSession).filter(models.ChatSession.id == session_id).first()
     if not db_session:
         raise HTTPException(status_code=404, detail="Chat session not found")
-    update_data = update.model_dump(exclude_unset=True)
+    update_data = update.model_dump(exclude_unset=True, exclude_none=True)
     for key, value in update_data.items():
         setattr(db_session, key, value)
     db.commit()
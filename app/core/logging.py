@@ -1,8 +1,11 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from datetime import datetime
-import json
+from datetime import datetime, timezone
+import orjson
 
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(exist_ok=True)
@@ -10,11 +13,11 @@ LOG_DIR.mkdir(exist_ok=True)
 class JSONFormatter(logging.Formatter):
     def format(self, record):
         log_obj = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "message": record.getMessage(),
         }
-        return json.dumps(log_obj)
+        return orjson.dumps(log_obj).decode()
 
 def setup_logging(name: str = "rag_chat", level: str = "INFO") -> logging.Logger:
     logger = logging.getLogger(name)
@@ -23,7 +26,14 @@ def setup_logging(name: str = "rag_chat", level: str = "INFO") -> logging.Logger
     
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-    logger.addHandler(console_handler)
+    
+    # Request code only merges the message text and enqueues the record (QueueHandler.prepare);
+    # a background thread applies the console format and does the stdout writes
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(QueueHandler(log_queue))
     
     logger.propagate = False
     return logger
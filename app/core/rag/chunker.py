@@ -1,15 +1,37 @@
 """Multi-format document processing and chunking service"""
+import functools
+import importlib
+import multiprocessing
 import os
 import json
+import mmap
 import xml.etree.ElementTree as ET
 import csv
 import io
 from typing import List, Dict, Any, Optional, Union
 from dataclasses import dataclass
-import PyPDF2
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from operator import itemgetter
 from ..logging import logger
 
+# Text files at least this large are decoded straight from a memory map
+MMAP_MIN_BYTES = 1024 * 1024
+
+# Rows of a CSV file kept as text before it is truncated
+CSV_MAX_ROWS = 1000
+
+CHUNK_SEPARATORS = ("\n\n", "\n", ". ", "! ", "? ", "; ", ", ", " ", "")
+
+# Below this many files the process pool costs more than it saves
+MIN_FILES_FOR_PARALLEL = 4
+
+@functools.lru_cache(maxsize=None)
+def _import_module(name: str):
+    """Import heavy parsing libraries on first use so API-only processes never load them"""
+    return importlib.import_module(name)
+
 @dataclass
 class Document:
     filename: str
@@ -43,14 +65,26 @@ class DocumentProcessor:
     def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ". ", "! ", "? ", "; ", ", ", " ", ""]
-        )
+        self._text_splitter = None
+        self._handlers = {
+            '.pdf': self.extract_text_from_pdf,
+            '.txt': self.extract_text_from_txt,
+            '.json': self.extract_text_from_json,
+            '.xml': self.extract_text_from_xml,
+            '.csv': self.extract_text_from_csv,
+        }
+        # These formats can be treated as text files
+        for ext in ('.md', '.html', '.log', '.yaml', '.yml'):
+            self._handlers[ext] = functools.partial(self.extract_text_from_txt, file_type=self.SUPPORTED_FORMATS[ext])
         logger.info(f"Initialized DocumentProcessor with chunk_size={chunk_size}")
         logger.info(f"Supported formats: {list(self.SUPPORTED_FORMATS.keys())}")
     
+    @property
+    def text_splitter(self):
+        if self._text_splitter is None:
+            self._text_splitter = get_text_splitter(self.chunk_size, self.chunk_overlap)
+        return self._text_splitter
+    
     def get_file_extension(self, file_path: str) -> str:
         """Get file extension in lowercase"""
         return os.path.splitext(file_path.lower())[1]
@@ -60,64 +94,81 @@ class DocumentProcessor:
         ext = self.get_file_extension(file_path)
         return ext in self.SUPPORTED_FORMATS
     
-    def extract_text_from_pdf(self, pdf_path: str) -> Document:
+    def _file_size(self, file_path: str, label: str) -> int:
+        """Stat a file once, raising FileNotFoundError if it is missing"""
+        try:
+            return os.stat(file_path).st_size
+        except FileNotFoundError:
+            raise FileNotFoundError(f"{label} not found: {file_path}") from None
+    
+    def extract_text_from_pdf(self, pdf_path: str, file_size: Optional[int] = None) -> Document:
         """Extract text from PDF files"""
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        if file_size is None:
+            file_size = self._file_size(pdf_path, "PDF")
+        filename = os.path.basename(pdf_path)
         
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            page_count = len(pdf_reader.pages)
-            
-            full_text = ""
-            for page_num in range(page_count):
-                page = pdf_reader.pages[page_num]
-                page_text = page.extract_text()
-                full_text += page_text + "\n\n"
-            
-            metadata = {
-                "filename": os.path.basename(pdf_path),
-                "file_path": pdf_path,
-                "file_type": "PDF",
-                "page_count": page_count,
-                "file_size": os.path.getsize(pdf_path)
-            }
-            
-            return Document(
-                filename=os.path.basename(pdf_path),
-                content=full_text.strip(),
-                page_count=page_count,
-                metadata=metadata
-            )
+        fitz = _import_module("fitz")  # PyMuPDF
+        with fitz.open(pdf_path) as pdf:
+            page_count = pdf.page_count
+            full_text = "\n\n".join(page.get_text("text") for page in pdf)
+        
+        metadata = {
+            "filename": filename,
+            "file_path": pdf_path,
+            "file_type": "PDF",
+            "page_count": page_count,
+            "file_size": file_size
+        }
+        
+        return Document(
+            filename=filename,
+            content=full_text.strip(),
+            page_count=page_count,
+            metadata=metadata
+        )
     
-    def extract_text_from_txt(self, txt_path: str) -> Document:
+    def extract_text_from_txt(self, txt_path: str, file_size: Optional[int] = None, file_type: str = "Text") -> Document:
         """Extract text from TXT files"""
-        if not os.path.exists(txt_path):
-            raise FileNotFoundError(f"TXT file not found: {txt_path}")
+        if file_size is None:
+            file_size = self._file_size(txt_path, "TXT file")
+        filename = os.path.basename(txt_path)
         
-        with open(txt_path, 'r', encoding='utf-8', errors='ignore') as file:
-            content = file.read()
+        if file_size >= MMAP_MIN_BYTES:
+            content = self._read_text_mapped(txt_path)
+        else:
+            with open(txt_path, 'r', encoding='utf-8', errors='ignore') as file:
+                content = file.read()
         
         metadata = {
-            "filename": os.path.basename(txt_path),
+            "filename": filename,
             "file_path": txt_path,
-            "file_type": "Text",
+            "file_type": file_type,
             "page_count": 1,
-            "file_size": os.path.getsize(txt_path),
+            "file_size": file_size,
             "line_count": len(content.splitlines())
         }
         
         return Document(
-            filename=os.path.basename(txt_path),
+            filename=filename,
             content=content,
             page_count=1,
             metadata=metadata
         )
     
-    def extract_text_from_json(self, json_path: str) -> Document:
+    def _read_text_mapped(self, txt_path: str) -> str:
+        """Decode a large file from a memory map, skipping the intermediate bytes copy of read()"""
+        with open(txt_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            content = str(mapped, 'utf-8', 'ignore')
+        # Match the universal-newline translation of text-mode reads
+        if "\r" in content:
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        return content
+    
+    def extract_text_from_json(self, json_path: str, file_size: Optional[int] = None) -> Document:
         """Extract text from JSON files"""
-        if not os.path.exists(json_path):
-            raise FileNotFoundError(f"JSON file not found: {json_path}")
+        if file_size is None:
+            file_size = self._file_size(json_path, "JSON file")
+        filename = os.path.basename(json_path)
         
         with open(json_path, 'r', encoding='utf-8') as file:
             try:
@@ -131,29 +182,28 @@ class DocumentProcessor:
                 content = file.read()
         
         metadata = {
-            "filename": os.path.basename(json_path),
+            "filename": filename,
             "file_path": json_path,
             "file_type": "JSON",
             "page_count": 1,
-            "file_size": os.path.getsize(json_path)
+            "file_size": file_size
         }
         
         return Document(
-            filename=os.path.basename(json_path),
+            filename=filename,
             content=content,
             page_count=1,
             metadata=metadata
         )
     
-    def extract_text_from_xml(self, xml_path: str) -> Document:
+    def extract_text_from_xml(self, xml_path: str, file_size: Optional[int] = None) -> Document:
         """Extract text from XML files"""
-        if not os.path.exists(xml_path):
-            raise FileNotFoundError(f"XML file not found: {xml_path}")
+        if file_size is None:
+            file_size = self._file_size(xml_path, "XML file")
+        filename = os.path.basename(xml_path)
         
         try:
-            tree = ET.parse(xml_path)
-            root = tree.getroot()
-            content = self._xml_to_text(root)
+            content = self._xml_to_text(xml_path)
         except ET.ParseError as e:
             logger.error(f"Invalid XML in {xml_path}: {e}")
             # Fallback to raw content
@@ -161,27 +211,27 @@ class DocumentProcessor:
                 content = file.read()
         
         metadata = {
-            "filename": os.path.basename(xml_path),
+            "filename": filename,
             "file_path": xml_path,
             "file_type": "XML",
             "page_count": 1,
-            "file_size": os.path.getsize(xml_path)
+            "file_size": file_size
         }
         
         return Document(
-            filename=os.path.basename(xml_path),
+            filename=filename,
             content=content,
             page_count=1,
             metadata=metadata
         )
     
-    def extract_text_from_csv(self, csv_path: str) -> Document:
+    def extract_text_from_csv(self, csv_path: str, file_size: Optional[int] = None) -> Document:
         """Extract text from CSV files"""
-        if not os.path.exists(csv_path):
-            raise FileNotFoundError(f"CSV file not found: {csv_path}")
+        if file_size is None:
+            file_size = self._file_size(csv_path, "CSV file")
+        filename = os.path.basename(csv_path)
         
         content_lines = []
-        row_count = 0
         
         with open(csv_path, 'r', encoding='utf-8', errors='ignore') as file:
             csv_reader = csv.reader(file)
@@ -190,111 +240,103 @@ class DocumentProcessor:
             if headers:
                 content_lines.append(f"CSV Headers: {', '.join(headers)}\n")
             
-            for row_num, row in enumerate(csv_reader, 1):
-                if row:  # Skip empty rows
-                    row_text = f"Row {row_num}: {', '.join(row)}"
-                    content_lines.append(row_text)
-                    row_count += 1
-                    
-                # Limit to prevent huge CSV files
-                if row_count > 1000:
-                    content_lines.append(f"\n... (truncated after 1000 rows)")
-                    break
+            # Number every row but skip empty ones; the row past the limit is kept and marks truncation
+            numbered_rows = filter(itemgetter(1), enumerate(csv_reader, 1))
+            rows = list(islice(numbered_rows, CSV_MAX_ROWS + 1))
+            content_lines.extend([f"Row {row_num}: {', '.join(row)}" for row_num, row in rows])
+            row_count = len(rows)
+            
+            # Limit to prevent huge CSV files
+            if row_count > CSV_MAX_ROWS:
+                content_lines.append(f"\n... (truncated after {CSV_MAX_ROWS} rows)")
         
         content = "\n".join(content_lines)
         
         metadata = {
-            "filename": os.path.basename(csv_path),
+            "filename": filename,
             "file_path": csv_path,
             "file_type": "CSV",
             "page_count": 1,
-            "file_size": os.path.getsize(csv_path),
+            "file_size": file_size,
             "row_count": row_count
         }
         
         return Document(
-            filename=os.path.basename(csv_path),
+            filename=filename,
             content=content,
             page_count=1,
             metadata=metadata
         )
     
-    def _json_to_text(self, data: Any, indent: int = 0) -> str:
+    def _json_to_text(self, data: Any, indent: int = 0, out: Optional[List[str]] = None) -> str:
         """Convert JSON data to readable text format"""
-        lines = []
+        if not isinstance(data, (dict, list)):
+            return str(data)
+        
+        # Nested calls append to the caller's list; only the top level joins
+        top_level = out is None
+        if top_level:
+            out = []
         prefix = "  " * indent
         
         if isinstance(data, dict):
             for key, value in data.items():
                 if isinstance(value, (dict, list)):
-                    lines.append(f"{prefix}{key}:")
-                    lines.append(self._json_to_text(value, indent + 1))
+                    out.append(f"{prefix}{key}:")
+                    self._json_to_text(value, indent + 1, out)
                 else:
-                    lines.append(f"{prefix}{key}: {value}")
-        elif isinstance(data, list):
+                    out.append(f"{prefix}{key}: {value}")
+        else:
             for i, item in enumerate(data):
                 if isinstance(item, (dict, list)):
-                    lines.append(f"{prefix}[{i}]:")
-                    lines.append(self._json_to_text(item, indent + 1))
+                    out.append(f"{prefix}[{i}]:")
+                    self._json_to_text(item, indent + 1, out)
                 else:
-                    lines.append(f"{prefix}[{i}]: {item}")
-        else:
-            return str(data)
+                    out.append(f"{prefix}[{i}]: {item}")
         
-        return "\n".join(lines)
+        return "\n".join(out) if top_level else ""
     
-    def _xml_to_text(self, element: ET.Element, indent: int = 0) -> str:
-        """Convert XML element to readable text format"""
+    def _xml_to_text(self, xml_path: str) -> str:
+        """Convert an XML file to readable text format, streaming elements as they are parsed"""
         lines = []
-        prefix = "  " * indent
-        
-        # Add element tag and attributes
-        tag_info = element.tag
-        if element.attrib:
-            attrs = ", ".join([f"{k}={v}" for k, v in element.attrib.items()])
-            tag_info += f" ({attrs})"
-        
-        lines.append(f"{prefix}{tag_info}:")
+        text_slots = []
+        depth = 0
         
-        # Add element text
-        if element.text and element.text.strip():
-            lines.append(f"{prefix}  {element.text.strip()}")
-        
-        # Process children
-        for child in element:
-            lines.append(self._xml_to_text(child, indent + 1))
+        for event, element in ET.iterparse(xml_path, events=("start", "end")):
+            if event == "start":
+                prefix = "  " * depth
+                # Add element tag and attributes
+                tag_info = element.tag
+                if element.attrib:
+                    attrs = ", ".join([f"{k}={v}" for k, v in element.attrib.items()])
+                    tag_info += f" ({attrs})"
+                lines.append(f"{prefix}{tag_info}:")
+                # Element text is only guaranteed once the element ends; keep a slot for it
+                text_slots.append(len(lines))
+                lines.append(None)
+                depth += 1
+            else:
+                depth -= 1
+                slot = text_slots.pop()
+                if element.text and element.text.strip():
+                    lines[slot] = f"{'  ' * depth}  {element.text.strip()}"
+                element.clear()
         
-        return "\n".join(lines)
+        return "\n".join(line for line in lines if line is not None)
     
     def extract_text_from_file(self, file_path: str) -> Document:
         """Main method to extract text from any supported file format"""
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-        
-        if not self.is_supported_format(file_path):
-            ext = self.get_file_extension(file_path)
+        ext = self.get_file_extension(file_path)
+        handler = self._handlers.get(ext)
+        if handler is None:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"File not found: {file_path}")
             raise ValueError(f"Unsupported file format: {ext}. Supported formats: {list(self.SUPPORTED_FORMATS.keys())}")
         
-        ext = self.get_file_extension(file_path)
+        file_size = self._file_size(file_path, "File")
         
         try:
-            if ext == '.pdf':
-                return self.extract_text_from_pdf(file_path)
-            elif ext == '.txt':
-                return self.extract_text_from_txt(file_path)
-            elif ext == '.json':
-                return self.extract_text_from_json(file_path)
-            elif ext == '.xml':
-                return self.extract_text_from_xml(file_path)
-            elif ext == '.csv':
-                return self.extract_text_from_csv(file_path)
-            elif ext in ['.md', '.html', '.log', '.yaml', '.yml']:
-                # These formats can be treated as text files
-                doc = self.extract_text_from_txt(file_path)
-                doc.metadata['file_type'] = self.SUPPORTED_FORMATS[ext]
-                return doc
-            else:
-                raise ValueError(f"Handler not implemented for {ext}")
+            return handler(file_path, file_size)
         except Exception as e:
             logger.error(f"Failed to extract text from {file_path}: {e}")
             raise
@@ -323,25 +365,77 @@ class DocumentProcessor:
         if not os.path.exists(folder_path):
             raise FileNotFoundError(f"Folder not found: {folder_path}")
         
-        results = []
-        supported_files = [f for f in os.listdir(folder_path) if self.is_supported_format(f)]
-        
-        for file_name in supported_files:
-            file_path = os.path.join(folder_path, file_name)
-            try:
-                document = self.extract_text_from_file(file_path)
-                chunks = self.chunk_document(document)
-                results.append((document, chunks))
-            except Exception as e:
-                logger.error(f"Failed to process {file_name}: {e}")
+        with os.scandir(folder_path) as entries:
+            supported_files = [
+                entry.path for entry in entries
+                # Same splitext rule as extract_text_from_file: no extensionless files or bare dotfiles.
+                # The name check comes first; is_file() may need a stat call.
+                if os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS and entry.is_file()
+            ]
+        return self.process_files(supported_files)
+    
+    def process_files(self, file_paths: List[str], min_files_for_parallel: int = MIN_FILES_FOR_PARALLEL) -> List[tuple[Document, List[Chunk]]]:
+        """
+        Process an explicit list of files, returning each document and its chunks.
+        Extraction runs in a process pool once there are enough files to be worth it.
+        """
+        if len(file_paths) < min_files_for_parallel:
+            results = map(self._process_file, file_paths)
+        else:
+            workers = min(os.cpu_count() or 1, len(file_paths))
+            # spawn: forking a process that already holds torch/DB state is unsafe
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [
+                    executor.submit(_extract_and_chunk, (self.chunk_size, self.chunk_overlap, file_path))
+                    for file_path in file_paths
+                ]
+                results = [_pool_result(future, file_path) for future, file_path in zip(futures, file_paths)]
         
-        return results
+        return [result for result in results if result is not None]
+    
+    def _process_file(self, file_path: str) -> Optional[tuple[Document, List[Chunk]]]:
+        try:
+            document = self.extract_text_from_file(file_path)
+            return document, self.chunk_document(document)
+        except Exception as e:
+            logger.error(f"Failed to process {os.path.basename(file_path)}: {e}")
+            return None
+
+SUPPORTED_EXTENSIONS = frozenset(DocumentProcessor.SUPPORTED_FORMATS)
+
+def _pool_result(future: Future, file_path: str) -> Optional[tuple[Document, List[Chunk]]]:
+    """
+    A worker that dies (out of memory, a native crash while parsing) breaks the whole pool.
+    Files finished before that keep their results; the rest fail like any unreadable file,
+    rather than retrying in this process a parse that may have been what crashed.
+    """
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        logger.error(f"Failed to process {os.path.basename(file_path)}: worker process died: {e}")
+        return None
+
+def _extract_and_chunk(job: tuple[int, int, str]) -> Optional[tuple[Document, List[Chunk]]]:
+    """Process pool entry point; each worker reuses one processor per chunking config"""
+    chunk_size, chunk_overlap, file_path = job
+    return get_document_processor(chunk_size, chunk_overlap)._process_file(file_path)
+
+@functools.lru_cache(maxsize=16)
+def get_text_splitter(chunk_size: int, chunk_overlap: int):
+    """Text splitter shared by every processor with the same chunking config"""
+    text_splitter = _import_module("langchain.text_splitter")
+    return text_splitter.RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=list(CHUNK_SEPARATORS)
+    )
 
 # Factory functions for backward compatibility and new functionality
 def get_pdf_chunker(chunk_size: int = 500, chunk_overlap: int = 50) -> DocumentProcessor:
     """Factory function for backward compatibility - now returns DocumentProcessor"""
     return DocumentProcessor(chunk_size, chunk_overlap)
 
+@functools.lru_cache(maxsize=16)
 def get_document_processor(chunk_size: int = 500, chunk_overlap: int = 50) -> DocumentProcessor:
-    """Factory function for the enhanced multi-format document processor"""
+    """Factory function for the enhanced multi-format document processor, shared per chunking config"""
     return DocumentProcessor(chunk_size, chunk_overlap)
@@ -0,0 +1,141 @@
+"""Two-tier cache for vector store search results"""
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set, Tuple
+import numpy as np
+from ..logging import logger
+
+DEFAULT_CAPACITY = 1024
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+# Random-projection LSH: several independent tables of a few hyperplane bits each, so a
+# near-duplicate query that lands across a hyperplane in one table still meets in another
+LSH_TABLES = 4
+LSH_BITS = 8
+LSH_SEED = 0
+
+class SemanticQueryCache:
+    """
+    LRU cache of search results keyed by normalized query text, with a semantic
+    fallback that reuses results for near-duplicate queries by cosine similarity
+    of their (unit-length) query embeddings. Only queries sharing an LSH bucket
+    with the lookup are compared.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.capacity = capacity
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._slots: "OrderedDict[Tuple[str, int, float], int]" = OrderedDict()
+        self._keys: List[Optional[Tuple[str, int, float]]] = [None] * capacity
+        self._results: List[Optional[List[Dict[str, Any]]]] = [None] * capacity
+        self._signatures: List[Optional[Tuple[int, ...]]] = [None] * capacity
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in range(LSH_TABLES)]
+        self._vectors: Optional[np.ndarray] = None
+        self._planes: Optional[np.ndarray] = None
+        self._free = list(range(capacity - 1, -1, -1))
+        logger.info(f"Initialized SemanticQueryCache with capacity={capacity}")
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return query.lower().strip()
+
+    def _key(self, query: str, top_k: int, threshold: float) -> Tuple[str, int, float]:
+        return (self.normalize_query(query), top_k, threshold)
+
+    def _signature(self, query_embedding: np.ndarray) -> Tuple[int, ...]:
+        """One bucket id per table: which side of each random hyperplane the query falls on"""
+        bits = (self._planes @ query_embedding > 0).reshape(LSH_TABLES, LSH_BITS)
+        return tuple(np.packbits(bits, axis=1)[:, 0].tolist())
+
+    def get(self, query: str, top_k: int, threshold: float) -> Optional[List[Dict[str, Any]]]:
+        """Exact lookup by normalized query and search parameters"""
+        key = self._key(query, top_k, threshold)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                return None
+            self._slots.move_to_end(key)
+            return self._results[slot]
+
+    def get_similar(self, query_embedding: np.ndarray, top_k: int, threshold: float) -> Optional[List[Dict[str, Any]]]:
+        """Semantic lookup: results of the closest cached query with the same parameters"""
+        with self._lock:
+            if self._vectors is None or not self._slots:
+                return None
+
+            query_embedding = query_embedding.astype(np.float32)
+            signature = self._signature(query_embedding)
+            candidates = set()
+            for table, bucket in zip(self._buckets, signature):
+                candidates.update(table.get(bucket, ()))
+            if not candidates:
+                return None
+
+            slots = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+            similarities = self._vectors[slots] @ query_embedding
+            for i in np.argsort(similarities)[::-1]:
+                if similarities[i] < self.similarity_threshold:
+                    return None
+                key = self._keys[slots[i]]
+                if key[1] == top_k and key[2] == threshold:
+                    self._slots.move_to_end(key)
+                    return self._results[slots[i]]
+            return None
+
+    def add(self, query: str, top_k: int, threshold: float, query_embedding: np.ndarray, results: List[Dict[str, Any]]):
+        key = self._key(query, top_k, threshold)
+        query_embedding = query_embedding.astype(np.float32)
+        with self._lock:
+            if self._vectors is None:
+                dimension = query_embedding.shape[0]
+                self._vectors = np.zeros((self.capacity, dimension), dtype=np.float32)
+                rng = np.random.default_rng(LSH_SEED)
+                self._planes = rng.standard_normal((LSH_TABLES * LSH_BITS, dimension)).astype(np.float32)
+
+            slot = self._slots.get(key)
+            if slot is None:
+                if not self._free:
+                    _, evicted = self._slots.popitem(last=False)
+                    self._release(evicted)
+                slot = self._free.pop()
+                self._slots[key] = slot
+            else:
+                self._slots.move_to_end(key)
+                self._unbucket(slot)
+
+            signature = self._signature(query_embedding)
+            for table, bucket in zip(self._buckets, signature):
+                table.setdefault(bucket, set()).add(slot)
+            self._keys[slot] = key
+            self._results[slot] = results
+            self._signatures[slot] = signature
+            self._vectors[slot] = query_embedding
+
+    def _unbucket(self, slot: int):
+        for table, bucket in zip(self._buckets, self._signatures[slot]):
+            members = table[bucket]
+            members.discard(slot)
+            if not members:
+                del table[bucket]
+        self._signatures[slot] = None
+
+    def _release(self, slot: int):
+        self._unbucket(slot)
+        self._keys[slot] = None
+        self._results[slot] = None
+        self._free.append(slot)
+
+    def clear(self):
+        """Drop every cached entry, e.g. after new documents are ingested"""
+        with self._lock:
+            for slot in self._slots.values():
+                self._release(slot)
+            self._slots.clear()
+
+_query_cache = None
+
+def get_query_cache() -> SemanticQueryCache:
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = SemanticQueryCache()
+    return _query_cache
@@ -1,204 +1,285 @@
 """Vector store service for pgvector operations"""
-import uuid
-from typing import List, Dict, Any, Optional
+import hashlib
+from contextlib import nullcontext
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
-from sqlalchemy import text
+from sqlalchemy import text, insert, delete, select, bindparam
 from sqlalchemy.orm import Session
-import json
+from sqlalchemy.dialects.postgresql import UUID
 from ..database import SessionLocal
 from ..logging import logger
+from ..uuid7 import uuid7
+from ...models.documents import Embedding, IngestedFile
 from .embeddings import get_embedding_service
+from .query_cache import get_query_cache
 from .chunker import Chunk, Document
 
+# Documents written per transaction during ingest
+INGEST_COMMIT_EVERY = 16
+# HNSW candidate list size per search; higher improves recall at the cost of latency
+HNSW_EF_SEARCH = 100
+SET_EF_SEARCH_SQL = text(f"SET LOCAL hnsw.ef_search = {HNSW_EF_SEARCH}")
+
+# Reported similarity for chunks found only by the full-text fallback
+TEXT_MATCH_SIMILARITY = 0.7
+
+# Nearest chunks by cosine similarity, computed as the inner product (<#> returns it negated)
+# since stored and query embeddings are unit length; when none clear the threshold, fall back to
+# full-text matches on any query word (GIN-indexed), ranked by ts_rank
+HYBRID_SEARCH_SQL = text("""
+    WITH nearest AS (
+        SELECT
+            e.id AS chunk_id,
+            e.document_id,
+            e.chunk_text,
+            e.chunk_index,
+            d.filename,
+            -(e.embedding <#> :query_embedding) AS similarity
+        FROM embeddings e
+        JOIN documents d ON e.document_id = d.id
+        ORDER BY e.embedding <#> :query_embedding
+        LIMIT :limit
+    ),
+    vector_matches AS (
+        SELECT *, similarity AS score, false AS is_text_match
+        FROM nearest
+        WHERE similarity >= :threshold
+    ),
+    text_matches AS (
+        SELECT
+            e.id AS chunk_id,
+            e.document_id,
+            e.chunk_text,
+            e.chunk_index,
+            d.filename,
+            :text_similarity AS similarity,
+            ts_rank(to_tsvector('english', e.chunk_text), q.terms) AS score,
+            true AS is_text_match
+        FROM embeddings e
+        JOIN documents d ON e.document_id = d.id
+        CROSS JOIN (
+            SELECT replace(plainto_tsquery('english', :query)::text, '&', '|')::tsquery AS terms
+        ) q
+        WHERE NOT EXISTS (SELECT 1 FROM vector_matches)
+          AND to_tsvector('english', e.chunk_text) @@ q.terms
+        ORDER BY score DESC
+        LIMIT :limit
+    )
+    SELECT * FROM vector_matches
+    UNION ALL
+    SELECT * FROM text_matches
+    ORDER BY score DESC
+    LIMIT :limit
+""").bindparams(
+    bindparam("query_embedding", type_=Embedding.embedding.type)
+).columns(chunk_id=UUID(as_uuid=True), document_id=UUID(as_uuid=True))
+
 class VectorStore:
     def __init__(self):
         self.embedding_service = get_embedding_service()
+        self.query_cache = get_query_cache()
         logger.info("Initialized VectorStore")
     
     def store_document(self, document: Document, db: Session) -> str:
-        try:
-            existing = db.execute(
-                text("SELECT id FROM documents WHERE filename = :filename"),
-                {"filename": document.filename}
-            ).fetchone()
-            
-            if existing:
-                document_id = existing[0]
-                db.execute(
-                    text("UPDATE documents SET content = :content, page_count = :page_count WHERE id = :id"),
-                    {"id": document_id, "content": document.content, "page_count": document.page_count}
-                )
-            else:
-                document_id = str(uuid.uuid4())
-                db.execute(
-                    text("INSERT INTO documents (id, filename, content, page_count) VALUES (:id, :filename, :content, :page_count)"),
-                    {"id": document_id, "filename": document.filename, "content": document.content, "page_count": document.page_count}
-                )
-            
-            db.commit()
-            return document_id
-        except Exception as e:
-            db.rollback()
-            raise e
+        """Insert or update a document; the caller owns the transaction and commits"""
+        # One round-trip upsert on the unique filename; a new id comes from the column's server default
+        return db.execute(
+            text("""
+                INSERT INTO documents (filename, content, page_count)
+                VALUES (:filename, :content, :page_count)
+                ON CONFLICT (filename) DO UPDATE
+                SET content = EXCLUDED.content, page_count = EXCLUDED.page_count
+                RETURNING id
+            """),
+            {"filename": document.filename, "content": document.content, "page_count": document.page_count}
+        ).scalar_one()
+    
+    def store_embeddings(self, chunks: List[Chunk], document_id: str, db: Session, embeddings: Optional[List[np.ndarray]] = None) -> int:
+        """Replace a document's embeddings; pass precomputed embeddings to skip the encoder"""
+        return self.store_embeddings_batch([(document_id, chunks)], db, embeddings)
     
-    def store_embeddings(self, chunks: List[Chunk], document_id: str, db: Session) -> int:
-        if not chunks:
+    def embed_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[np.ndarray]:
+        """Embed many texts with a single encoder call; batch size defaults to the device's"""
+        if not texts:
+            return []
+        return self.embedding_service.generate_embeddings_batch(texts, batch_size=batch_size)
+    
+    def store_embeddings_batch(self, pending: List[Tuple[str, List[Chunk]]], db: Session, embeddings: Optional[List[np.ndarray]] = None) -> int:
+        """Embed and bulk-insert the chunks of several documents at once; the caller commits"""
+        pending = [(document_id, chunks) for document_id, chunks in pending if chunks]
+        if not pending:
             return 0
         
-        # Delete existing embeddings
+        all_chunks = [(document_id, chunk) for document_id, chunks in pending for chunk in chunks]
+        chunk_hashes = [chunk_hash(chunk.text) for _, chunk in all_chunks]
+        if embeddings is None:
+            # Look up reusable embeddings before the old rows of these documents are deleted
+            embeddings = self._embed_chunks([chunk.text for _, chunk in all_chunks], chunk_hashes, db)
+        
         db.execute(
-            text("DELETE FROM embeddings WHERE document_id = :document_id"),
-            {"document_id": document_id}
+            delete(Embedding).where(Embedding.document_id.in_([document_id for document_id, _ in pending]))
         )
         
-        # Generate embeddings
-        texts = [chunk.text for chunk in chunks]
-        embeddings = self.embedding_service.generate_embeddings_batch(texts)
+        # Plain dicts through Core insert: one executemany, no ORM objects per row.
+        # Ids are filled in up front so no column default has to run per row.
+        rows = [
+            {
+                "id": uuid7(),
+                "document_id": document_id,
+                "chunk_text": chunk.text,
+                "chunk_hash": content_hash,
+                "chunk_index": chunk.index,
+                "embedding": embedding,
+                "chunk_metadata": chunk.metadata
+            }
+            for (document_id, chunk), content_hash, embedding in zip(all_chunks, chunk_hashes, embeddings)
+        ]
+        db.execute(insert(Embedding), rows)
+        return len(rows)
+    
+    def _embed_chunks(self, texts: List[str], hashes: List[str], db: Session) -> List[np.ndarray]:
+        """Embed chunk texts, reusing any stored embedding of byte-identical text"""
+        known = dict(db.execute(
+            select(Embedding.chunk_hash, Embedding.embedding)
+            .where(Embedding.chunk_hash.in_(list(set(hashes))))
+            .distinct(Embedding.chunk_hash)
+        ).all())
         
-        # Store embeddings
-        stored_count = 0
-        for chunk, embedding in zip(chunks, embeddings):
-            embedding_id = str(uuid.uuid4())
-            db.execute(
-                text("""
-                    INSERT INTO embeddings 
-                    (id, document_id, chunk_text, chunk_index, embedding, chunk_metadata)
-                    VALUES (:id, :document_id, :chunk_text, :chunk_index, :embedding, :chunk_metadata)
-                """),
-                {
-                    "id": embedding_id,
-                    "document_id": document_id,
-                    "chunk_text": chunk.text,
-                    "chunk_index": chunk.index,
-                    "embedding": str(embedding.tolist()),
-                    "chunk_metadata": json.dumps(chunk.metadata)
-                }
-            )
-            stored_count += 1
+        missing = {}
+        for chunk_text, content_hash in zip(texts, hashes):
+            if content_hash not in known:
+                missing.setdefault(content_hash, chunk_text)
+        if missing:
+            known.update(zip(missing, self.embed_batch(list(missing.values()))))
+        logger.info(f"Reused {len(texts) - len(missing)} of {len(texts)} chunk embeddings")
         
-        db.commit()
-        return stored_count
+        return [known[content_hash] for content_hash in hashes]
     
-    def search_similar(self, query: str, top_k: int = 5, threshold: float = 0.1) -> List[Dict[str, Any]]:
-        """Enhanced search with multiple strategies"""
+    def store_documents(self, results: List[Tuple[Document, List[Chunk]]], db: Session) -> Tuple[Dict[str, str], int, List[str]]:
+        """
+        Store processed documents and their chunks on one session, embedding and committing
+        INGEST_COMMIT_EVERY documents at a time. Returns the stored document ids by filename,
+        the number of chunks stored and the failed filenames.
+        """
+        document_ids = {}
+        total_chunks = 0
+        failed_documents = []
+        
+        for start in range(0, len(results), INGEST_COMMIT_EVERY):
+            batch_ids = {}
+            pending = []
+            for document, chunks in results[start:start + INGEST_COMMIT_EVERY]:
+                try:
+                    # Savepoint so one bad document doesn't abort the whole transaction
+                    with db.begin_nested():
+                        document_id = self.store_document(document, db)
+                except Exception as e:
+                    logger.error(f"Failed to process {document.filename}: {e}")
+                    failed_documents.append(document.filename)
+                    continue
+                batch_ids[document.filename] = document_id
+                pending.append((document_id, chunks))
+            
+            try:
+                total_chunks += self.store_embeddings_batch(pending, db)
+                # Recorded upload hashes no longer describe the stored content; uploads re-add theirs
+                if batch_ids:
+                    db.execute(delete(IngestedFile).where(IngestedFile.document_id.in_(list(batch_ids.values()))))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to store embeddings for {len(pending)} documents: {e}")
+                failed_documents.extend(batch_ids)
+                continue
+            document_ids.update(batch_ids)
+        
+        if document_ids:
+            self.query_cache.clear()
+        for document, chunks in results:
+            if document.filename in document_ids:
+                logger.info(f"Processed {document.filename}: {len(chunks)} chunks")
+        
+        return document_ids, total_chunks, failed_documents
+    
+    def search_similar(self, query: str, top_k: int = 5, threshold: float = 0.1, db: Optional[Session] = None) -> List[Dict[str, Any]]:
+        """
+        Enhanced search with multiple strategies, served from the query cache when possible.
+        Pass the request's session to search on its connection instead of checking out another.
+        """
+        cached = self.query_cache.get(query, top_k, threshold)
+        if cached is not None:
+            logger.info(f"Query cache hit for query: {query}")
+            return cached
+        
         try:
             # Get query embedding
             query_embedding = self.embedding_service.generate_embeddings_batch([query])[0]
             logger.info(f"Generated embedding for query: {query}")
             
-            # Strategy 1: Try vector similarity search first
+            cached = self.query_cache.get_similar(query_embedding, top_k, threshold)
+            if cached is not None:
+                logger.info(f"Semantic query cache hit for query: {query}")
+                return cached
+            
+            search_results = self._search(query, query_embedding, top_k, threshold, db)
+            if search_results:
+                self.query_cache.add(query, top_k, threshold, query_embedding, search_results)
+            return search_results
+        except Exception as e:
+            logger.error(f"Search completely failed: {e}")
+            return []
+    
+    def _search(self, query: str, query_embedding: np.ndarray, top_k: int, threshold: float, db: Optional[Session] = None) -> List[Dict[str, Any]]:
+        """Vector similarity search with a full-text fallback, in a single query"""
+        own_session = db is None
+        if own_session:
             db = SessionLocal()
-            try:
-                vector_results = db.execute(
-                    text("""
-                        SELECT 
-                            e.id as chunk_id,
-                            e.document_id,
-                            e.chunk_text,
-                            e.chunk_index,
-                            d.filename,
-1 - (e.embedding <-> :query_embedding) as similarity
-                        FROM embeddings e
-                        JOIN documents d ON e.document_id = d.id
-                        WHERE e.embedding IS NOT NULL
-ORDER BY e.embedding <-> :query_embedding
-                        LIMIT :limit
-                    """),
+        try:
+            connection = db.connection()
+            # On the caller's session, a savepoint keeps a failed search from aborting its transaction
+            with nullcontext() if own_session else connection.begin_nested():
+                connection.execute(SET_EF_SEARCH_SQL)
+                rows = connection.execute(
+                    HYBRID_SEARCH_SQL,
                     {
-                        "query_embedding": str(query_embedding.tolist()),
+                        "query_embedding": query_embedding,
+                        "query": query,
+                        "threshold": threshold,
+                        "text_similarity": TEXT_MATCH_SIMILARITY,
                         "limit": top_k
                     }
                 ).fetchall()
-                
-                if vector_results:
-                    logger.info(f"Found {len(vector_results)} vector similarity results")
-                    search_results = []
-                    for row in vector_results:
-                        if row.similarity >= threshold:
-                            search_results.append({
-                                "chunk_id": str(row.chunk_id),
-                                "document_id": str(row.document_id),
-                                "chunk_text": row.chunk_text,
-                                "chunk_index": row.chunk_index,
-                                "filename": row.filename,
-                                "similarity": float(row.similarity)
-                            })
-                    
-                    if search_results:
-                        db.close()
-                        return search_results
-                    else:
-                        logger.info(f"Vector search found {len(vector_results)} results but none above threshold {threshold}")
-                        
-            except Exception as e:
-                logger.warning(f"Vector search failed, falling back to text search: {e}")
-            finally:
-                db.close()
-            
-            # Strategy 2: Simplified text search fallback with fresh session
-            query_words = query.lower().split()
-            if not query_words:
-                logger.info("No query words found")
-                return []
-            
-            db = SessionLocal()
-            try:
-                # Use simple text search with OR conditions
-                text_conditions = []
-                params = {"limit": top_k}
-                
-                for i, word in enumerate(query_words[:3]):  # Limit to 3 words to avoid complexity
-                    text_conditions.append(f"LOWER(e.chunk_text) LIKE :word_{i}")
-                    params[f"word_{i}"] = f"%{word}%"
-                
-                if text_conditions:
-                    where_clause = " OR ".join(text_conditions)
-                    logger.info(f"Text search with conditions: {where_clause}")
-                    
-                    results = db.execute(
-                        text(f"""
-                            SELECT 
-                                e.id as chunk_id,
-                                e.document_id,
-                                e.chunk_text,
-                                e.chunk_index,
-                                d.filename,
-                                0.7 as similarity
-                            FROM embeddings e
-                            JOIN documents d ON e.document_id = d.id
-                            WHERE ({where_clause})
-                            ORDER BY e.chunk_index
-                            LIMIT :limit
-                        """),
-                        params
-                    ).fetchall()
-                    
-                    search_results = []
-                    for row in results:
-                        search_results.append({
-                            "chunk_id": str(row.chunk_id),
-                            "document_id": str(row.document_id),
-                            "chunk_text": row.chunk_text,
-                            "chunk_index": row.chunk_index,
-                            "filename": row.filename,
-                            "similarity": float(row.similarity)
-                        })
-                    
-                    logger.info(f"Found {len(search_results)} text search results for query: {query}")
-                    return search_results
-                else:
-                    logger.info("No text conditions generated")
-                    return []
-            except Exception as e:
-                logger.error(f"Text search failed: {e}")
-                db.rollback()
-                return []
-            finally:
-                db.close()
-                
         except Exception as e:
-            logger.error(f"Search completely failed: {e}")
+            logger.error(f"Search query failed: {e}")
             return []
+        finally:
+            if own_session:
+                db.close()
+        
+        search_results = [
+            {
+                "chunk_id": row.chunk_id,
+                "document_id": row.document_id,
+                "chunk_text": row.chunk_text,
+                "chunk_index": row.chunk_index,
+                "filename": row.filename,
+                "similarity": float(row.similarity)
+            }
+            for row in rows
+        ]
+        
+        source = "text search" if rows and rows[0].is_text_match else "vector similarity"
+        logger.info(f"Found {len(search_results)} {source} results for query: {query}")
+        return search_results
+
+def chunk_hash(text: str) -> str:
+    """Content hash identifying chunks with byte-identical text"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+_vector_store = None
 
 def get_vector_store() -> VectorStore:
-    return VectorStore()
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = VectorStore()
+    return _vector_store
@@ -0,0 +1,31 @@
+"""Streaming JSON responses for list endpoints"""
+from typing import Any, Iterable, Iterator, Type
+import orjson
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+# Rows fetched per round-trip when streaming a query result
+STREAM_BATCH_SIZE = 500
+
+def _json_array(rows: Iterable, schema: Type[BaseModel]) -> Iterator[bytes]:
+    yield b"["
+    first = True
+    for row in rows:
+        if not first:
+            yield b","
+        first = False
+        yield schema.model_validate(row).model_dump_json().encode()
+    yield b"]"
+
+class UTCZResponse(ORJSONResponse):
+    """ORJSONResponse writing UTC datetimes with a Z suffix, as the Pydantic-serialized endpoints do"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z)
+
+def stream_json_list(rows: Iterable, schema: Type[BaseModel]) -> StreamingResponse:
+    """
+    Serialize rows one at a time as a JSON array. Pass a query with yield_per() so fetching
+    overlaps with serialization; the request's DB session stays open until the response is sent.
+    """
+    return StreamingResponse(_json_array(rows, schema), media_type="application/json")
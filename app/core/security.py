@@ -1,6 +1,7 @@
 from fastapi import Security, HTTPException, status, Depends
 from fastapi.security import APIKeyHeader
 from sqlalchemy.orm import Session
+import hashlib
 import os
 from ..models.chat import User
 from .database import SessionLocal
@@ -13,6 +14,13 @@ HARDCODED_USERS = {
     "K8mN5pQ2wX@tZ7vB#nC4uA1s": {"id": "user-2", "name": "Prof. Michael Chen"}
 }
 
+# api_key -> persisted user columns; the hardcoded users never change once their row exists
+_user_cache = {}
+
+def hash_api_key(api_key: str) -> bytes:
+    """SHA-256 digest stored in place of the raw key"""
+    return hashlib.sha256(api_key.encode("utf-8")).digest()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -24,19 +32,31 @@ async def get_current_user(api_key_header: str = Security(api_key_header), db: S
     if api_key_header not in HARDCODED_USERS:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or missing API Key")
     
+    cached = _user_cache.get(api_key_header)
+    if cached is not None:
+        # Detached stand-in for the row; callers only read its columns
+        return User(**cached)
+    
     user_info = HARDCODED_USERS[api_key_header]
+    api_key_hash = hash_api_key(api_key_header)
     
     # Check if user exists in database, create if not
-    user = db.query(User).filter(User.api_key == api_key_header).first()
+    user = db.query(User).filter(User.api_key_hash == api_key_hash).first()
     if not user:
         user = User(
             name=user_info["name"],
-            api_key=api_key_header
+            api_key_hash=api_key_hash
         )
         db.add(user)
         db.commit()
         db.refresh(user)
     
+    _user_cache[api_key_header] = {
+        "id": user.id,
+        "name": user.name,
+        "api_key_hash": user.api_key_hash,
+        "created_at": user.created_at
+    }
     return user
 
 # Backward compatibility
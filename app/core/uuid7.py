@@ -0,0 +1,20 @@
+"""Time-ordered UUIDv7 (RFC 9562) primary keys"""
+import os
+import time
+import uuid
+
+def uuid7() -> uuid.UUID:
+    """
+    48-bit Unix timestamp in milliseconds, then 74 random bits around the version and
+    variant fields. New ids sort after older ones, so B-tree inserts land on the rightmost leaf.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (
+        (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76                          # version
+        | (rand >> 68) << 64                 # rand_a: 12 bits
+        | 0b10 << 62                         # variant
+        | rand & ((1 << 62) - 1)             # rand_b: 62 bits
+    )
+    return uuid.UUID(int=value)
@@ -1,35 +1,58 @@
-import uuid
-from sqlalchemy import Column, String, Boolean, Text, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, String, Boolean, Text, ForeignKey, TIMESTAMP, Index, LargeBinary, text, event, DDL
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, ENUM
 from sqlalchemy.sql import func
 from ..core.database import Base
+from ..core.uuid7 import uuid7
+
+# Enum values are stored as a 4-byte label reference instead of free text
+SENDER_TYPE = ENUM("user", "assistant", "system", name="sender_t")
 
 class User(Base):
     __tablename__ = "users"
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     name = Column(String, nullable=False)
-    api_key = Column(String, nullable=False, unique=True)
+    # SHA-256 of the API key; the raw key is never stored
+    api_key_hash = Column(LargeBinary(32), nullable=False, unique=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     sessions = relationship("ChatSession", back_populates="user", cascade="all, delete-orphan")
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     session_name = Column(String, nullable=False, default="New Chat")
-    is_favorite = Column(Boolean, default=False)
+    is_favorite = Column(Boolean, nullable=False, server_default=text("false"))
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
     user = relationship("User", back_populates="sessions")
-    messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
+    # Never lazy-loaded: eager-load explicitly where messages are needed. Deleting a session
+    # leaves its messages to the database's ON DELETE CASCADE instead of loading them first.
+    messages = relationship(
+        "ChatMessage", back_populates="session", cascade="all, delete-orphan",
+        order_by="ChatMessage.created_at", lazy="raise", passive_deletes=True
+    )
+    __table_args__ = (
+        # A user's sessions newest-first, id breaking timestamp ties for keyset paging;
+        # DESC order is served by a backward scan
+        Index("ix_chat_sessions_user_updated", "user_id", "updated_at", "id"),
+        # Same ordering over favorites only, so the favorites list never scans other sessions
+        Index("ix_chat_sessions_user_favorites", "user_id", "updated_at", "id", postgresql_where=text("is_favorite")),
+    )
+
+# Sessions are rewritten on every message, rename and favorite: leave a fifth of each page
+# free so the new row version can stay on the same page. Append-only tables keep the default 100.
+event.listen(ChatSession.__table__, "after_create", DDL("ALTER TABLE chat_sessions SET (fillfactor = 80)"))
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    session_id = Column(UUID(as_uuid=True), ForeignKey("chat_sessions.id"), nullable=False)
-    sender = Column(String, nullable=False)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    session_id = Column(UUID(as_uuid=True), ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False)
+    sender = Column(SENDER_TYPE, nullable=False)
     content = Column(Text, nullable=False)
     retrieved_context = Column(Text, nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     session = relationship("ChatSession", back_populates="messages")
+    __table_args__ = (
+        Index("ix_chat_messages_session_created", "session_id", "created_at", "id"),
+    )
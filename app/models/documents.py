@@ -1,26 +1,70 @@
-import uuid
-from sqlalchemy import Column, String, Integer, Text, TIMESTAMP, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, Text, TIMESTAMP, Index, ForeignKey, text, event, DDL
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC
 from ..core.database import Base
+from ..core.uuid7 import uuid7
 
 class Document(Base):
     __tablename__ = "documents"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     filename = Column(String(255), nullable=False, unique=True, index=True)
     content = Column(Text, nullable=False)
     page_count = Column(Integer, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Substring filename search (ILIKE '%...%'); needs the pg_trgm extension
+        Index(
+            "ix_documents_filename_trgm", "filename",
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"}
+        ),
+    )
 
 class Embedding(Base):
     __tablename__ = "embeddings"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    document_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
     chunk_text = Column(Text, nullable=False)
+    # SHA-1 of chunk_text, used to reuse embeddings of unchanged chunks on re-ingest
+    chunk_hash = Column(String(40), index=True)
     chunk_index = Column(Integer, nullable=False)
-    embedding = Column(Vector(384), nullable=False)
-    chunk_metadata = Column(JSON, default=dict)
+    # FP16 storage: half the bytes per row and per HNSW traversal step, same cosine ranking
+    embedding = Column(HALFVEC(384), nullable=False)
+    chunk_metadata = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Approximate nearest-neighbour search by negative inner product (<#>); embeddings are
+        # unit length, so this ranks like cosine distance without computing norms per comparison
+        Index(
+            "ix_embeddings_embedding_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 24, "ef_construction": 128},
+            postgresql_ops={"embedding": "halfvec_ip_ops"}
+        ),
+        # Full-text fallback search; queries must use this exact expression
+        Index(
+            "ix_embeddings_chunk_text_fts", text("to_tsvector('english', chunk_text)"),
+            postgresql_using="gin"
+        ),
+    )
+
+# LZ4 instead of the default pglz for TOASTed text: faster to decompress on every read.
+# Applies to values large enough to be compressed (document contents, oversized chunks).
+for table, column in ((Document.__table__, "content"), (Embedding.__table__, "chunk_text")):
+    event.listen(table, "after_create", DDL(f"ALTER TABLE {table.name} ALTER COLUMN {column} SET COMPRESSION lz4"))
+
+class IngestedFile(Base):
+    """
+    Content hash of an uploaded file, so unchanged re-uploads skip parsing and embedding.
+    Identical content uploaded under several filenames gets one row per document.
+    """
+    __tablename__ = "ingested_files"
+    
+    hash = Column(String(64), primary_key=True)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True, index=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
@@ -1,21 +1,23 @@
 import uuid
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
+from typing import Literal, TypedDict
+
+Sender = Literal["user", "assistant", "system"]
 
 class UserBase(BaseModel):
     name: str
-    api_key: str
 
 class UserCreate(UserBase):
-    pass
+    api_key: str
 
 class User(UserBase):
     id: uuid.UUID
     created_at: datetime
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
 
 class ChatMessageBase(BaseModel):
-    sender: str
+    sender: Sender
     content: str
     retrieved_context: str | None = None
 
@@ -26,7 +28,16 @@ class ChatMessage(ChatMessageBase):
     id: uuid.UUID
     session_id: uuid.UUID
     created_at: datetime
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
+
+class ChatMessageRow(TypedDict):
+    """A chat_messages row as read by list endpoints; same shape as ChatMessage, no validation"""
+    id: uuid.UUID
+    session_id: uuid.UUID
+    sender: Sender
+    content: str
+    retrieved_context: str | None
+    created_at: datetime
 
 class ChatSessionBase(BaseModel):
     session_name: str = "New Chat"
@@ -43,5 +54,7 @@ class ChatSession(ChatSessionBase):
     id: uuid.UUID
     created_at: datetime
     updated_at: datetime
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
+
+class ChatSessionWithMessages(ChatSession):
     messages: list[ChatMessage] = []
-    model_config = ConfigDict(from_attributes=True)
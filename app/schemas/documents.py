@@ -1,35 +1,42 @@
 import uuid
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, ConfigDict, Field, StrictFloat, StrictInt, StringConstraints
+from typing import Annotated, List, Dict, Any, Optional
 from datetime import datetime
 
+# Response models are immutable and reject unknown fields
+RESPONSE_CONFIG = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
+
 class DocumentBase(BaseModel):
     filename: str
+    model_config = RESPONSE_CONFIG
 
 class DocumentIngestionRequest(BaseModel):
     folder_path: str = Field(default="input_docs")
-    chunk_size: int = Field(default=500, ge=100, le=2000)
-    chunk_overlap: int = Field(default=50, ge=0, le=200)
+    chunk_size: Annotated[StrictInt, Field(ge=100, le=2000)] = 500
+    chunk_overlap: Annotated[StrictInt, Field(ge=0, le=200)] = 50
 
 class DocumentIngestionResponse(BaseModel):
     processed_documents: int
     total_chunks: int
     failed_documents: List[str] = []
     processing_time_seconds: float
+    model_config = RESPONSE_CONFIG
 
 class RAGSearchRequest(BaseModel):
-    query: str = Field(..., min_length=1, max_length=1000)
-    top_k: int = Field(default=5, ge=1, le=20)
-    threshold: float = Field(default=0.3, ge=0.0, le=1.0)
+    query: Annotated[str, StringConstraints(min_length=1, max_length=1000, strict=True)]
+    top_k: Annotated[StrictInt, Field(ge=1, le=20)] = 5
+    threshold: Annotated[StrictFloat, Field(ge=0.0, le=1.0)] = 0.3
 
 class RAGSearchResult(BaseModel):
-    chunk_id: str
-    document_id: str
+    chunk_id: uuid.UUID
+    document_id: uuid.UUID
     filename: str
     chunk_text: str
     similarity: float
+    model_config = RESPONSE_CONFIG
 
 class RAGSearchResponse(BaseModel):
     query: str
     results: List[RAGSearchResult]
     total_results: int
+    model_config = RESPONSE_CONFIG
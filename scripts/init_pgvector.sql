@@ -1,5 +1,7 @@
 -- Enable pgvector extension FIRST
 CREATE EXTENSION IF NOT EXISTS vector;
+-- Trigram indexes for filename search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Grant permissions
 --GRANT ALL ON SCHEMA public TO myuser;
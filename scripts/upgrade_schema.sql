@@ -0,0 +1,164 @@
+-- Schema changes for databases created before the current models.
+-- Fresh databases get all of these from Base.metadata.create_all at startup;
+-- run this once against an existing database (statements are idempotent).
+
+-- Store API keys as SHA-256 digests instead of plaintext
+ALTER TABLE users ADD COLUMN IF NOT EXISTS api_key_hash BYTEA;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_name = 'users' AND column_name = 'api_key') THEN
+        UPDATE users SET api_key_hash = sha256(convert_to(api_key, 'UTF8'));
+        ALTER TABLE users DROP COLUMN api_key;
+    END IF;
+END $$;
+ALTER TABLE users ALTER COLUMN api_key_hash SET NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS users_api_key_hash_key ON users (api_key_hash);
+
+-- Keyset pagination indexes end in id, the tiebreaker for equal timestamps.
+-- Drop versions left over without it so they are recreated below.
+DO $$
+DECLARE
+    index_name text;
+BEGIN
+    FOR index_name IN
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname IN ('ix_chat_messages_session_created', 'ix_chat_sessions_user_updated',
+                            'ix_chat_sessions_user_favorites')
+          AND i.indnatts < 3
+    LOOP
+        EXECUTE format('DROP INDEX %I', index_name);
+    END LOOP;
+END $$;
+
+-- Keyset pagination of messages within a session
+CREATE INDEX IF NOT EXISTS ix_chat_messages_session_created ON chat_messages (session_id, created_at, id);
+
+-- Keyset pagination of a user's sessions by last activity
+CREATE INDEX IF NOT EXISTS ix_chat_sessions_user_updated ON chat_sessions (user_id, updated_at, id);
+
+-- Half-precision embeddings (halfvec needs the pgvector extension at 0.7 or later)
+ALTER EXTENSION vector UPDATE;
+DO $$
+BEGIN
+    IF (SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = 'embeddings'::regclass AND attname = 'embedding') <> 'halfvec(384)' THEN
+        -- The old index is built on vector_cosine_ops; it is recreated below
+        DROP INDEX IF EXISTS ix_embeddings_embedding_hnsw;
+        ALTER TABLE embeddings ALTER COLUMN embedding TYPE halfvec(384) USING embedding::halfvec(384);
+    END IF;
+END $$;
+
+-- Approximate nearest-neighbour search on chunk embeddings (inner product of unit vectors).
+-- Rebuild an index left over with an older operator class or build parameters.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class WHERE relname = 'ix_embeddings_embedding_hnsw'
+               AND (NOT reloptions @> ARRAY['m=24', 'ef_construction=128']
+                    OR pg_get_indexdef(oid) NOT LIKE '%halfvec_ip_ops%')) THEN
+        DROP INDEX ix_embeddings_embedding_hnsw;
+    END IF;
+END $$;
+-- HNSW builds are much faster when the graph fits in maintenance_work_mem
+SET maintenance_work_mem = '2GB';
+SET max_parallel_maintenance_workers = 7;
+CREATE INDEX IF NOT EXISTS ix_embeddings_embedding_hnsw ON embeddings
+    USING hnsw (embedding halfvec_ip_ops) WITH (m = 24, ef_construction = 128);
+RESET maintenance_work_mem;
+RESET max_parallel_maintenance_workers;
+
+-- Content hash of each chunk so re-ingest reuses embeddings of unchanged text
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS chunk_hash VARCHAR(40);
+CREATE INDEX IF NOT EXISTS ix_embeddings_chunk_hash ON embeddings (chunk_hash);
+
+-- Full-text fallback search on chunk text
+CREATE INDEX IF NOT EXISTS ix_embeddings_chunk_text_fts ON embeddings
+    USING gin (to_tsvector('english', chunk_text));
+
+-- Embeddings belong to their document and go with it
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'embeddings_document_id_fkey') THEN
+        DELETE FROM embeddings e WHERE NOT EXISTS (SELECT 1 FROM documents d WHERE d.id = e.document_id);
+        ALTER TABLE embeddings ADD CONSTRAINT embeddings_document_id_fkey
+            FOREIGN KEY (document_id) REFERENCES documents (id) ON DELETE CASCADE;
+    END IF;
+END $$;
+
+-- Upload content hashes belong to their document and go with it
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ingested_files_document_id_fkey') THEN
+        DELETE FROM ingested_files f WHERE NOT EXISTS (SELECT 1 FROM documents d WHERE d.id = f.document_id);
+        ALTER TABLE ingested_files ADD CONSTRAINT ingested_files_document_id_fkey
+            FOREIGN KEY (document_id) REFERENCES documents (id) ON DELETE CASCADE;
+    END IF;
+END $$;
+
+-- One upload hash row per document, so identical content under another filename is tracked too
+DO $$
+BEGIN
+    IF (SELECT cardinality(conkey) FROM pg_constraint WHERE conname = 'ingested_files_pkey') = 1 THEN
+        ALTER TABLE ingested_files DROP CONSTRAINT ingested_files_pkey;
+        ALTER TABLE ingested_files ADD PRIMARY KEY (hash, document_id);
+    END IF;
+END $$;
+
+-- Binary JSON chunk metadata, never NULL
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'embeddings' AND column_name = 'chunk_metadata') <> 'jsonb' THEN
+        ALTER TABLE embeddings ALTER COLUMN chunk_metadata TYPE jsonb USING chunk_metadata::jsonb;
+    END IF;
+END $$;
+UPDATE embeddings SET chunk_metadata = '{}'::jsonb WHERE chunk_metadata IS NULL;
+ALTER TABLE embeddings ALTER COLUMN chunk_metadata SET DEFAULT '{}'::jsonb;
+ALTER TABLE embeddings ALTER COLUMN chunk_metadata SET NOT NULL;
+
+-- Messages go with their session, without the ORM loading them first
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                   WHERE conname = 'chat_messages_session_id_fkey' AND confdeltype = 'c') THEN
+        ALTER TABLE chat_messages DROP CONSTRAINT IF EXISTS chat_messages_session_id_fkey;
+        ALTER TABLE chat_messages ADD CONSTRAINT chat_messages_session_id_fkey
+            FOREIGN KEY (session_id) REFERENCES chat_sessions (id) ON DELETE CASCADE;
+    END IF;
+END $$;
+
+-- Message sender as an enum instead of free text
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'sender_t') THEN
+        CREATE TYPE sender_t AS ENUM ('user', 'assistant', 'system');
+    END IF;
+    IF (SELECT udt_name FROM information_schema.columns
+        WHERE table_name = 'chat_messages' AND column_name = 'sender') <> 'sender_t' THEN
+        ALTER TABLE chat_messages ALTER COLUMN sender TYPE sender_t USING sender::sender_t;
+    END IF;
+END $$;
+
+-- Substring filename search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_documents_filename_trgm ON documents USING GIN (filename gin_trgm_ops);
+
+-- LZ4 compression for new TOASTed text values (existing rows keep pglz until rewritten)
+ALTER TABLE documents ALTER COLUMN content SET COMPRESSION lz4;
+ALTER TABLE embeddings ALTER COLUMN chunk_text SET COMPRESSION lz4;
+
+-- Database-generated ids for users and documents (gen_random_uuid is built in since PostgreSQL 13)
+ALTER TABLE users ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE documents ALTER COLUMN id SET DEFAULT gen_random_uuid();
+
+-- Free space on session pages for in-page updates; VACUUM FULL rewrites existing pages
+-- with it (takes an exclusive lock on chat_sessions while it runs)
+ALTER TABLE chat_sessions SET (fillfactor = 80);
+VACUUM FULL chat_sessions;
+
+-- Non-null favorite flag and a partial index for listing a user's favorite sessions
+UPDATE chat_sessions SET is_favorite = false WHERE is_favorite IS NULL;
+ALTER TABLE chat_sessions ALTER COLUMN is_favorite SET DEFAULT false;
+ALTER TABLE chat_sessions ALTER COLUMN is_favorite SET NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_chat_sessions_user_favorites ON chat_sessions (user_id, updated_at, id)
+    WHERE is_favorite;
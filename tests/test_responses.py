@@ -0,0 +1,31 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from app.core.responses import _json_array, UTCZResponse
+from app.models.documents import Document
+from app.schemas.documents import DocumentBase
+from app.schemas.chat import ChatMessage
+
+def test_streams_orm_documents():
+    documents = [
+        Document(filename="a.pdf", content="first", page_count=1),
+        Document(filename="b.txt", content="second", page_count=1),
+    ]
+    body = b"".join(_json_array(documents, DocumentBase))
+    assert json.loads(body) == [{"filename": "a.pdf"}, {"filename": "b.txt"}]
+
+def test_streams_empty_list():
+    assert b"".join(_json_array([], DocumentBase)) == b"[]"
+
+def test_utc_z_response_matches_pydantic_datetimes():
+    row = {
+        "id": uuid.uuid4(),
+        "session_id": uuid.uuid4(),
+        "sender": "user",
+        "content": "hello",
+        "retrieved_context": None,
+        "created_at": datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+    }
+    body = json.loads(UTCZResponse([row]).body)
+    assert body == [json.loads(ChatMessage.model_validate(row).model_dump_json())]
+    assert body[0]["created_at"].endswith("Z")